@@ -0,0 +1,464 @@
+"""Benchmarks do app de obras, executados fora do Streamlit.
+
+A suíte 'app' roda o app contra um cliente gspread falso (em memória), com latência
+e cota por minuto configuráveis, e mede a carga de dados, o cálculo de status, cada
+página e cada caminho de escrita. A suíte 'formatacao' compara a formatação por
+célula com a vetorizada. Os resultados podem ser salvos em JSON para comparar versões.
+
+Uso:
+    python benchmark_obras.py
+    python benchmark_obras.py --suite app --tamanhos 100 10000 --latencia-ms 80 --saida bench.json
+    python benchmark_obras.py --suite formatacao --tamanhos 10000 100000 --repeticoes 5
+"""
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from itertools import count
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+from gspread.exceptions import APIError
+
+# Fora de `streamlit run`, cada chamada st.* avisa que não há sessão. A configuração é lida
+# antes de baixar o nível do log, senão a leitura tardia restaura o nível padrão.
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level("error")
+
+import app_obras_testes as app
+
+# Fora de `streamlit run`, st.fragment não executa a função: as páginas chamam os corpos dos fragmentos
+for _nome in [nome for nome in vars(app) if nome.startswith('_fragmento_')]:
+    setattr(app, _nome, inspect.unwrap(getattr(app, _nome)))
+
+TAMANHOS_PADRAO = [100, 10_000, 100_000]
+SEMANAS_POR_OBRA = 50
+
+
+def medir(funcao, repeticoes=3, preparar=None):
+    """Executa `funcao` algumas vezes e retorna o menor tempo (em segundos).
+
+    `preparar`, se informado, roda antes de cada repetição, fora da medição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+# --- Cliente gspread falso ---
+
+class _RespostaFalsa:
+    """Resposta HTTP mínima para montar um APIError do gspread."""
+
+    def __init__(self, codigo, mensagem):
+        self.status_code = codigo
+        self.headers = {}
+        self.text = mensagem
+        self._erro = {'error': {'code': codigo, 'message': mensagem, 'status': 'RESOURCE_EXHAUSTED'}}
+
+    def json(self):
+        return self._erro
+
+
+class ApiFalsa:
+    """Conta as chamadas do cliente falso e simula a latência e a cota por minuto da API.
+
+    Com cota_por_minuto > 0, chamadas além da cota na janela de 60 s recebem um 429.
+    """
+
+    def __init__(self, latencia_s=0.0, cota_por_minuto=0):
+        self.latencia_s = latencia_s
+        self.cota_por_minuto = cota_por_minuto
+        self.chamadas = 0
+        self.recusadas = 0
+        self.revisao = 0
+        self._janela = deque()
+        self._lock = threading.Lock()
+
+    def chamar(self):
+        with self._lock:
+            agora = time.monotonic()
+            while self._janela and agora - self._janela[0] > 60:
+                self._janela.popleft()
+            if self.cota_por_minuto and len(self._janela) >= self.cota_por_minuto:
+                self.recusadas += 1
+                raise APIError(_RespostaFalsa(429, "Quota exceeded (simulado)"))
+            self._janela.append(agora)
+            self.chamadas += 1
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+
+    def registrar_escrita(self):
+        with self._lock:
+            self.revisao += 1
+
+
+def _faixa_a1(intervalo):
+    """'A12:D' -> (11, None) e 'A12:D15' -> (11, 15): fatia de linhas (0 = cabeçalho)."""
+    m = re.match(r"A(\d+):[A-Z]+(\d*)$", intervalo)
+    return int(m.group(1)) - 1, (int(m.group(2)) if m.group(2) else None)
+
+
+class AbaFalsa:
+    """Worksheet em memória com os métodos usados pelo SheetsBackend."""
+
+    def __init__(self, api, titulo, id_aba, linhas):
+        self.api = api
+        self.title = titulo
+        self.id = id_aba
+        self.linhas = linhas # Linha 0 = cabeçalho
+        self._lock = threading.Lock() # A API serializa os appends: cada um recebe linhas próprias
+
+    def _fatia(self, intervalo):
+        inicio, fim = _faixa_a1(intervalo)
+        return [list(linha) for linha in self.linhas[inicio:fim]]
+
+    def get(self, intervalo):
+        self.api.chamar()
+        largura = len(_faixa_a1_colunas(intervalo))
+        return [linha[:largura] for linha in self._fatia(intervalo)]
+
+    def batch_get(self, intervalos):
+        self.api.chamar()
+        return [[linha[:len(_faixa_a1_colunas(i))] for linha in self._fatia(i)] for i in intervalos]
+
+    def batch_update(self, dados):
+        self.api.chamar()
+        for item in dados:
+            inicio, _ = _faixa_a1(item['range'])
+            self.linhas[inicio] = list(item['values'][0])
+        self.api.registrar_escrita()
+
+    def append_rows(self, linhas, insert_data_option=None):
+        self.api.chamar()
+        with self._lock:
+            primeira = len(self.linhas) + 1
+            self.linhas.extend(list(linha) for linha in linhas)
+        self.api.registrar_escrita()
+        return {'updates': {'updatedRange': f"'{self.title}'!A{primeira}:D{primeira + len(linhas) - 1}"}}
+
+    def append_row(self, valores, insert_data_option=None):
+        return self.append_rows([valores], insert_data_option)
+
+
+def _faixa_a1_colunas(intervalo):
+    """'A2:B' -> ['A', 'B'] (colunas cobertas pelo intervalo, até Z)."""
+    m = re.match(r"([A-Z]+)\d*:([A-Z]+)\d*$", intervalo)
+    return [chr(c) for c in range(ord(m.group(1)), ord(m.group(2)) + 1)]
+
+
+class _RespostaJson:
+    def __init__(self, dados):
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+
+class _HttpFalso:
+    """HTTPClient do gspread falso: só a consulta da versão do arquivo no Drive."""
+
+    def __init__(self, api):
+        self.api = api
+
+    def request(self, metodo, url, params=None):
+        self.api.chamar()
+        return _RespostaJson({'version': str(self.api.revisao)})
+
+
+class PlanilhaFalsa:
+    """Spreadsheet em memória: values_batch_get, worksheets e a versão no Drive (client.request)."""
+
+    def __init__(self, api, abas):
+        self.api = api
+        self.id = 'planilha-falsa'
+        self.client = _HttpFalso(api)
+        self.abas = {aba.title: aba for aba in abas}
+
+    def worksheets(self):
+        self.api.chamar()
+        return list(self.abas.values())
+
+    def values_batch_get(self, intervalos, params=None):
+        self.api.chamar()
+        faixas = []
+        for intervalo in intervalos:
+            titulo, _, a1 = intervalo.partition('!')
+            aba = self.abas[titulo.strip("'")]
+            valores = aba._fatia(a1) if a1 else [list(linha) for linha in aba.linhas]
+            faixas.append({'values': valores})
+        return {'valueRanges': faixas}
+
+
+class ClienteSheetsFalso:
+    """Cliente gspread falso: `open` devolve sempre a mesma planilha em memória."""
+
+    def __init__(self, planilha):
+        self.planilha = planilha
+        self.api = planilha.api
+
+    def open(self, nome):
+        self.api.chamar()
+        return self.planilha
+
+
+def gerar_planilha(n_despesas, api, seed=0):
+    """Gera obras e despesas semanais sintéticas (SEMANAS_POR_OBRA semanas por obra)."""
+    rng = np.random.default_rng(seed)
+    n_obras = max(1, -(-n_despesas // SEMANAS_POR_OBRA))
+    ids = np.arange(1, n_obras + 1)
+    info = pd.DataFrame({
+        'Obra_ID': ids,
+        'Nome_Obra': [f"Obra {i:05d}" for i in ids],
+        'Valor_Total_Inicial': rng.uniform(50_000, 2_000_000, n_obras).round(2),
+        'Data_Inicio': '2023-01-02',
+    })
+    posicoes = np.arange(n_despesas)
+    semanas = posicoes % SEMANAS_POR_OBRA + 1
+    despesas = pd.DataFrame({
+        'Obra_ID': posicoes // SEMANAS_POR_OBRA + 1,
+        'Semana_Ref': semanas,
+        'Data_Semana': (pd.Timestamp('2023-01-02') + pd.to_timedelta((semanas - 1) * 7, unit='D')).strftime('%Y-%m-%d'),
+        'Gasto_Semana': rng.uniform(100, 40_000, n_despesas).round(2),
+    })
+    usuarios = pd.DataFrame({'name': ['Benchmark'], 'username': ['bench'], 'password': ['bench']})
+
+    abas = []
+    for id_aba, (titulo, df) in enumerate(((app.ABA_INFO, info), (app.ABA_DESPESAS, despesas), (app.ABA_USUARIOS, usuarios))):
+        abas.append(AbaFalsa(api, titulo, id_aba, [list(df.columns)] + df.values.tolist()))
+    return PlanilhaFalsa(api, abas)
+
+
+def gerar_csv_importacao(obra_ids, semana_inicial, seed=0):
+    """CSV (bytes) com SEMANAS_POR_OBRA semanas novas de cada obra, a partir de `semana_inicial`."""
+    rng = np.random.default_rng(seed)
+    semanas = np.arange(semana_inicial, semana_inicial + SEMANAS_POR_OBRA)
+    df = pd.DataFrame({
+        'Obra_ID': np.repeat(obra_ids, len(semanas)),
+        'Semana_Ref': np.tile(semanas, len(obra_ids)),
+        'Data_Semana': '2024-01-01',
+        'Gasto_Semana': rng.uniform(100, 40_000, len(obra_ids) * len(semanas)).round(2),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+# --- Suíte de formatação ---
+
+def gerar_dados_formatacao(n_linhas, seed=0):
+    """Gera valores, IDs e datas sintéticos no formato das tabelas do app."""
+    rng = np.random.default_rng(seed)
+    return {
+        'valores': pd.Series(rng.normal(50_000, 200_000, n_linhas).round(2)),
+        'ids': pd.Series(rng.integers(1, 500, n_linhas)),
+        'datas': pd.Series(pd.Timestamp('2020-01-06') + pd.to_timedelta(rng.integers(0, 2000, n_linhas), unit='D'))
+                   .dt.strftime('%Y-%m-%d'),
+    }
+
+
+def benchmark_formatacao(tamanhos, repeticoes=3):
+    """Compara a formatação por célula (.apply) com a formatação vetorizada."""
+    resultados = []
+    for n_linhas in tamanhos:
+        dados = gerar_dados_formatacao(n_linhas)
+        casos = {
+            'moeda': (lambda: dados['valores'].apply(app.formatar_moeda),
+                      lambda: app.formatar_moeda_series(dados['valores'])),
+            'id': (lambda: dados['ids'].apply(lambda x: f"{int(x):03d}" if x > 0 else '000'),
+                   lambda: app.formatar_id_series(dados['ids'])),
+            'data': (lambda: pd.to_datetime(dados['datas']).dt.strftime('%d/%m/%Y'),
+                     lambda: app.formatar_data_series(dados['datas'])),
+        }
+        for nome, (por_celula, vetorizado) in casos.items():
+            t_antigo = medir(por_celula, repeticoes)
+            t_novo = medir(vetorizado, repeticoes)
+            resultados.append({
+                'caso': f'formatacao_{nome}', 'linhas': n_linhas,
+                'antes_s': t_antigo, 'depois_s': t_novo, 'speedup': t_antigo / t_novo,
+            })
+    return resultados
+
+
+# --- Suíte do app (Sheets simulado) ---
+
+def _preparar_app(planilha, diretorio):
+    """Aponta o app para a planilha falsa, com diário de escritas em `diretorio` e sem snapshot."""
+    os.environ["OBRAS_SNAPSHOT_DIR"] = ""
+    os.environ["OBRAS_DIARIO_PATH"] = os.path.join(diretorio, f"diario_{time.time_ns()}.jsonl")
+    app.get_diario_escritas.clear()
+    app.get_snapshot_disco.clear()
+    app.get_data_cache.clear()
+    # O envio do diário é medido à parte (caso 'envio_diario'), não em segundo plano
+    app.iniciar_reprodutor_diario = lambda: None
+
+    # Cota generosa no agendador: quem limita é a cota simulada da API falsa
+    agendador = app.AgendadorSheets(leituras_por_minuto=1_000_000, escritas_por_minuto=1_000_000, rajada=1_000_000)
+    backend = app.SheetsBackend(ClienteSheetsFalso(planilha), app.PLANILHA_NOME, agendador=agendador)
+    app.get_storage_backend = lambda: backend
+    return backend
+
+
+def benchmark_app(tamanhos, repeticoes=3, latencia_s=0.0, cota_por_minuto=0):
+    """Mede carga, status, páginas e escritas contra o Sheets simulado, para cada tamanho."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for n_linhas in tamanhos:
+            api = ApiFalsa(latencia_s, cota_por_minuto)
+            planilha = gerar_planilha(n_linhas, api)
+            backend = _preparar_app(planilha, diretorio)
+            df_info, df_despesas = app.load_data()
+            despesas = planilha.abas[app.ABA_DESPESAS]
+            novas_semanas = count(SEMANAS_POR_OBRA + 1) # Semana_Ref ainda não usadas pela obra 1
+            novos_ids = count(len(df_info) + 1)
+
+            def nova_carga():
+                app.get_data_cache.clear()
+                backend._indices.clear()
+
+            def semana_externa():
+                # Linha acrescentada fora do app: a próxima carga faz a sincronização incremental
+                despesas.linhas.append([1, next(novas_semanas), '2024-01-01', 10.0])
+                api.registrar_escrita()
+                app.get_data_cache().verificado_em = 0.0
+
+            def limpar_derivados():
+                app.get_data_cache()._derivados.clear()
+
+            def lote_para_envio():
+                app.insert_new_despesa([1, next(novas_semanas), '2024-01-01', 5.0])
+                app.update_despesa(1, 1, 30.0, date(2024, 1, 1))
+
+            # Importação: a cada repetição, as próximas semanas de todas as obras menos a 1
+            # (que recebe as semanas dos casos de escrita), sem lacunas
+            semanas_importacao = count(SEMANAS_POR_OBRA + 1, SEMANAS_POR_OBRA)
+            arquivo_importacao = []
+
+            def novo_arquivo_importacao():
+                arquivo_importacao[:] = [gerar_csv_importacao(df_info['Obra_ID'].to_numpy()[1:], next(semanas_importacao))]
+
+            def importar_arquivo():
+                lote = app.ImportacaoLote().validar(
+                    app.ler_blocos_importacao(io.BytesIO(arquivo_importacao[0]), "importacao.csv"), *app.load_data())
+                lote.gravar(backend)
+
+            # Escritas: caminho do formulário (diário + cache); o envio ao backend é o 'envio_diario'
+            casos = [
+                ('load_data_fria', app.load_data, nova_carga),
+                ('load_data_cache', app.load_data, None),
+                ('load_data_incremental', app.load_data, semana_externa),
+                ('calcular_status_financeiro', lambda: app.calcular_status_financeiro(df_info, df_despesas), None),
+                ('previsao_gastos', lambda: app.obter_previsao_gastos(*app.load_data()), limpar_derivados),
+                ('pagina_cadastro_obra', lambda: app.show_cadastro_obra(app.load_data()[0]), limpar_derivados),
+                ('pagina_registro_despesa', lambda: app.show_registro_despesa(*app.load_data()), limpar_derivados),
+                ('pagina_consulta_dados', lambda: app.show_consulta_dados(*app.load_data()), limpar_derivados),
+                ('pagina_relatorio_obra', lambda: app.show_relatorio_obra(*app.load_data()), limpar_derivados),
+                ('pagina_painel_carteira', lambda: app.show_painel_carteira(*app.load_data()), limpar_derivados),
+                ('relatorio_todas_zip', lambda: app.obter_relatorio_obras(*app.load_data()).gerar(
+                    'zip', io.BytesIO()), limpar_derivados),
+                ('escrita_insert_obra', lambda: app.insert_new_obra(
+                    [next(novos_ids), "Obra benchmark", 1000.0, '2024-01-01']), None),
+                ('escrita_update_obra', lambda: app.update_obra_info(
+                    1, "Obra 00001 (editada)", 2000.0, date(2024, 1, 1)), None),
+                ('escrita_insert_despesa', lambda: app.insert_new_despesa(
+                    [1, next(novas_semanas), '2024-01-01', 10.0]), None),
+                ('escrita_update_despesa', lambda: app.update_despesa(1, 1, 20.0, date(2024, 1, 1)), None),
+                ('envio_diario', lambda: app.get_diario_escritas().enviar(backend), lote_para_envio),
+                # Validação e gravação em lote (~`linhas` despesas novas); inclui a ressincronização
+                # deixada pela importação anterior
+                ('importacao_csv', importar_arquivo, novo_arquivo_importacao),
+            ]
+            for nome, funcao, preparar in casos:
+                chamadas_antes, recusadas_antes = api.chamadas, api.recusadas
+                tempo = medir(funcao, repeticoes, preparar)
+                resultados.append({
+                    'caso': nome, 'linhas': n_linhas, 'tempo_s': tempo,
+                    'chamadas_api': (api.chamadas - chamadas_antes) / repeticoes,
+                    'recusadas_429': api.recusadas - recusadas_antes,
+                })
+    return resultados
+
+
+def imprimir_resultados(resultados):
+    comparativos = [r for r in resultados if 'speedup' in r]
+    if comparativos:
+        print(f"{'caso':<24}{'linhas':>10}{'antes (ms)':>14}{'depois (ms)':>14}{'speedup':>10}")
+        for r in comparativos:
+            print(f"{r['caso']:<24}{r['linhas']:>10}{r['antes_s'] * 1000:>14.2f}"
+                  f"{r['depois_s'] * 1000:>14.2f}{r['speedup']:>9.1f}x")
+
+    simples = [r for r in resultados if 'tempo_s' in r]
+    if simples:
+        if comparativos:
+            print()
+        print(f"{'caso':<28}{'linhas':>10}{'tempo (ms)':>14}{'chamadas API':>14}{'429':>6}")
+        for r in simples:
+            print(f"{r['caso']:<28}{r['linhas']:>10}{r['tempo_s'] * 1000:>14.2f}"
+                  f"{r['chamadas_api']:>14.1f}{r['recusadas_429']:>6}")
+
+
+def _versao_codigo():
+    """Commit atual do repositório (None fora de um checkout git)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_resultados(caminho, resultados, parametros):
+    """Grava os resultados em JSON, com a versão do código e do ambiente, para comparação futura."""
+    documento = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'commit': _versao_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'parametros': parametros,
+        'resultados': resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do app de obras.")
+    parser.add_argument('--suite', choices=['app', 'formatacao', 'todas'], default='todas')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--latencia-ms', type=float, default=0.0,
+                        help="Latência simulada de cada chamada à API (suíte app).")
+    parser.add_argument('--cota-por-minuto', type=int, default=0,
+                        help="Chamadas por minuto aceitas pela API simulada; 0 = sem limite (suíte app). "
+                             "As esperas reais de backoff do agendador entram nos tempos.")
+    parser.add_argument('--saida', help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    resultados = []
+    if args.suite in ('app', 'todas'):
+        resultados += benchmark_app(args.tamanhos, args.repeticoes, args.latencia_ms / 1000, args.cota_por_minuto)
+    if args.suite in ('formatacao', 'todas'):
+        resultados += benchmark_formatacao(args.tamanhos, args.repeticoes)
+
+    imprimir_resultados(resultados)
+    if args.saida:
+        salvar_resultados(args.saida, resultados, vars(args))
+        print(f"\nResultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
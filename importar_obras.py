@@ -0,0 +1,76 @@
+"""Importação em lote de obras ou despesas semanais a partir de um CSV/XLSX, fora do Streamlit.
+
+Usa o mesmo armazenamento do app (variáveis OBRAS_* ou .streamlit/secrets.toml). O arquivo
+inteiro é validado antes de qualquer escrita; linhas com problema são listadas e puladas.
+Repetir a importação do mesmo arquivo não duplica dados: o que já entrou aparece como
+"Já cadastrada".
+
+Uso:
+    python importar_obras.py obras_antigas.csv
+    python importar_obras.py despesas.xlsx --tipo despesas --relatorio problemas.csv
+    python importar_obras.py despesas.csv --simular
+"""
+import argparse
+import sys
+import time
+
+import streamlit.config
+import streamlit.logger
+
+# Fora de `streamlit run`, cada chamada st.* avisa que não há sessão (ver benchmark_obras.py)
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level("error")
+
+import app_obras_testes as app
+
+TIPOS = {'auto': None, 'obras': app.ABA_INFO, 'despesas': app.ABA_DESPESAS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa obras ou despesas semanais de um CSV/XLSX.")
+    parser.add_argument('arquivo')
+    parser.add_argument('--tipo', choices=list(TIPOS), default='auto',
+                        help="Conteúdo do arquivo (padrão: detectado pelo cabeçalho).")
+    parser.add_argument('--simular', action='store_true', help="Só valida; não grava nada.")
+    parser.add_argument('--relatorio', help="Arquivo CSV para salvar a lista de problemas.")
+    args = parser.parse_args()
+
+    backend = app.get_storage_backend()
+    if backend is None:
+        print("Armazenamento não configurado ou indisponível.", file=sys.stderr)
+        return 2
+
+    inicio = time.perf_counter()
+    try:
+        df_info, df_despesas, _ = app._carregar_abas(backend)
+        lote = app.ImportacaoLote(TIPOS[args.tipo]).validar(
+            app.ler_blocos_importacao(args.arquivo, args.arquivo), df_info, df_despesas)
+    except Exception as e:
+        print(f"Erro ao validar {args.arquivo}: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{args.arquivo} -> {lote.aba}: {lote.linhas_lidas} linha(s) lida(s), "
+          f"{len(lote.validas)} válida(s), {len(lote.problemas)} com problema "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    for problema, quantidade in lote.problemas['Problema'].value_counts().items():
+        print(f"  {quantidade:>7}  {problema}")
+    for obra_id, faltando in lote.lacunas.itertuples(index=False, name=None):
+        print(f"  Obra {obra_id:03d}: semanas faltando {faltando}")
+
+    if not args.simular and not lote.validas.empty:
+        inicio = time.perf_counter()
+        lote.gravar(backend, progresso=lambda feitas, total: print(f"  gravadas {feitas} de {total}"))
+        print(f"{lote.gravadas} linha(s) gravada(s) em {time.perf_counter() - inicio:.1f} s")
+        for linha, problema in lote.nao_gravadas.itertuples(index=False, name=None):
+            print(f"  linha {linha}: {problema}")
+        if lote.erro_gravacao:
+            print(f"Erro ao gravar: {lote.erro_gravacao}", file=sys.stderr)
+
+    if args.relatorio:
+        lote.problemas.to_csv(args.relatorio, index=False)
+    falhou = lote.erro_gravacao or (not args.simular and lote.gravadas < len(lote.validas))
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Fixtures dos testes: o app roda contra o cliente gspread falso do benchmark_obras."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_obras as bench # Também silencia os avisos do Streamlit fora de `streamlit run`
+
+app = bench.app
+
+
+@pytest.fixture
+def api():
+    return bench.ApiFalsa()
+
+
+@pytest.fixture
+def planilha(api):
+    """Planilha falsa com 2 obras e 100 despesas (50 semanas por obra)."""
+    return bench.gerar_planilha(2 * bench.SEMANAS_POR_OBRA, api)
+
+
+@pytest.fixture
+def backend(planilha, tmp_path, monkeypatch):
+    """SheetsBackend sobre a planilha falsa, com diário em tmp_path e caches do processo zerados."""
+    # _preparar_app troca funções do módulo e variáveis de ambiente: o monkeypatch as restaura depois
+    for nome in ('get_storage_backend', 'iniciar_reprodutor_diario'):
+        monkeypatch.setattr(app, nome, getattr(app, nome))
+    for variavel in ('OBRAS_SNAPSHOT_DIR', 'OBRAS_DIARIO_PATH', 'OBRAS_CACHE_COMPARTILHADO'):
+        monkeypatch.setenv(variavel, '')
+    app.get_cache_compartilhado.clear()
+    backend = bench._preparar_app(planilha, str(tmp_path))
+    yield backend
+    for recurso in (app.get_diario_escritas, app.get_data_cache, app.get_snapshot_disco, app.get_cache_compartilhado):
+        recurso.clear()
+
+
+def nova_replica(planilha):
+    """Outro SheetsBackend sobre a mesma planilha falsa, como o de outra réplica do app."""
+    agendador = app.AgendadorSheets(leituras_por_minuto=1_000_000, escritas_por_minuto=1_000_000, rajada=1_000_000)
+    return app.SheetsBackend(bench.ClienteSheetsFalso(planilha), app.PLANILHA_NOME, agendador=agendador)
+
+
+def reiniciar_processo():
+    """Descarta o diário e o cache do processo, como numa nova partida do app."""
+    app.get_diario_escritas.clear()
+    app.get_data_cache.clear()
+
+
+def linhas_da_aba(planilha, aba):
+    """DataFrame tipado com o conteúdo atual da aba falsa (sem passar pelo backend)."""
+    linhas = planilha.abas[aba].linhas
+    return app._aplicar_schema(aba, pd.DataFrame(linhas[1:], columns=linhas[0]))
@@ -0,0 +1,163 @@
+"""AgendadorSheets: repetição de erros transitórios, espera exponencial, cota e leituras agrupadas."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from gspread.exceptions import APIError
+
+from conftest import app, bench
+
+
+def _erro(codigo, retry_after=None):
+    resposta = bench._RespostaFalsa(codigo, f"Erro {codigo} (simulado)")
+    if retry_after is not None:
+        resposta.headers['Retry-After'] = str(retry_after)
+    return APIError(resposta)
+
+
+class ClienteInstavel:
+    """Chamada da API que falha com os erros dados, em ordem, e depois responde `resultado`."""
+
+    def __init__(self, *erros, resultado='ok'):
+        self.erros = list(erros)
+        self.resultado = resultado
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return self.resultado
+
+
+@pytest.fixture
+def esperas():
+    return []
+
+
+@pytest.fixture
+def agendador(esperas):
+    """Sem limite de cota na prática; as esperas são registradas em vez de dormidas."""
+    return app.AgendadorSheets(leituras_por_minuto=1_000_000, escritas_por_minuto=1_000_000,
+                               rajada=1_000, max_tentativas=4, dormir=esperas.append)
+
+
+@pytest.mark.parametrize('codigo', [429, 500, 503])
+@pytest.mark.parametrize('tipo', ['leitura', 'escrita'])
+def test_erro_transitorio_e_repetido(agendador, esperas, codigo, tipo):
+    chamada = ClienteInstavel(_erro(codigo), _erro(codigo))
+    assert agendador.executar(tipo, chamada) == 'ok'
+    assert chamada.chamadas == 3 and len(esperas) == 2
+    metricas = agendador.metricas()
+    assert metricas['repeticoes'] == 2 and metricas['falhas'] == 0
+    assert metricas['erros_429'] == (2 if codigo == 429 else 0)
+
+
+def test_erro_permanente_nao_e_repetido(agendador, esperas):
+    chamada = ClienteInstavel(_erro(400))
+    with pytest.raises(APIError):
+        agendador.executar('leitura', chamada)
+    assert chamada.chamadas == 1 and esperas == []
+    assert agendador.metricas()['falhas'] == 1
+
+
+def test_desiste_depois_do_maximo_de_tentativas(agendador, esperas):
+    chamada = ClienteInstavel(*[_erro(503)] * 10)
+    with pytest.raises(APIError):
+        agendador.executar('leitura', chamada)
+    assert chamada.chamadas == agendador.max_tentativas
+    assert len(esperas) == agendador.max_tentativas - 1
+
+
+def test_espera_exponencial_com_jitter(agendador, esperas):
+    agendador.executar('leitura', ClienteInstavel(*[_erro(500)] * 3))
+    for tentativa, espera in enumerate(esperas, start=1):
+        teto = min(app.ESPERA_MAXIMA_SEGUNDOS, app.ESPERA_BASE_SEGUNDOS * 2 ** (tentativa - 1))
+        assert teto / 2 <= espera <= teto
+
+
+def test_espera_respeita_retry_after(agendador, esperas):
+    agendador.executar('leitura', ClienteInstavel(_erro(429, retry_after=30)))
+    assert esperas == [30.0]
+
+
+def test_append_nao_e_repetido_em_5xx(agendador, esperas):
+    # Num 5xx o append pode ter sido gravado: repetir duplicaria a linha
+    chamada = ClienteInstavel(_erro(503))
+    with pytest.raises(APIError):
+        agendador.executar('escrita', chamada, idempotente=False)
+    assert chamada.chamadas == 1 and esperas == []
+
+
+def test_append_e_repetido_em_429(agendador, esperas):
+    # No 429 a API garante que nada foi gravado
+    chamada = ClienteInstavel(_erro(429))
+    assert agendador.executar('escrita', chamada, idempotente=False) == 'ok'
+    assert chamada.chamadas == 2 and len(esperas) == 1
+
+
+def test_cota_espera_pela_vez(esperas):
+    agendador = app.AgendadorSheets(leituras_por_minuto=60, escritas_por_minuto=60, rajada=2, dormir=esperas.append)
+    for _ in range(3):
+        agendador.executar('leitura', ClienteInstavel())
+    assert len(esperas) == 1 and 0.9 <= esperas[0] <= 1.0 # Um token por segundo após a rajada
+    agendador.executar('escrita', ClienteInstavel()) # Cota de escrita separada
+    assert len(esperas) == 1 and agendador.metricas()['esperas_limite'] == 1
+
+
+def test_429_esvazia_o_balde(esperas):
+    agendador = app.AgendadorSheets(leituras_por_minuto=60, escritas_por_minuto=60, rajada=5, dormir=esperas.append)
+    agendador.executar('leitura', ClienteInstavel(_erro(429, retry_after=0)))
+    # A cota real acabou: a repetição espera a reposição em vez de usar o resto da rajada
+    assert len(esperas) == 2 and 0.9 <= esperas[1] <= 1.0
+
+
+def _executar_agrupadas(agendador, chamada, quantas):
+    """Dispara `quantas` leituras com a mesma chave e só libera a chamada quando todas chegaram."""
+    liberar = threading.Event()
+
+    def chamada_lenta():
+        liberar.wait(10)
+        return chamada()
+
+    def ler():
+        try:
+            return agendador.executar('leitura', chamada_lenta, chave=('aba', 'Despesas'))
+        except APIError as e:
+            return e
+
+    with ThreadPoolExecutor(quantas) as executor:
+        futuros = [executor.submit(ler) for _ in range(quantas)]
+        limite = time.monotonic() + 10
+        while agendador.metricas()['leituras_agrupadas'] < quantas - 1 and time.monotonic() < limite:
+            time.sleep(0.001)
+        liberar.set()
+        return [futuro.result() for futuro in futuros]
+
+
+def test_leituras_identicas_sao_agrupadas(agendador):
+    chamada = ClienteInstavel(resultado=['linhas'])
+    resultados = _executar_agrupadas(agendador, chamada, 4)
+    assert chamada.chamadas == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
+    metricas = agendador.metricas()
+    assert metricas['requisicoes'] == 1 and metricas['leituras_agrupadas'] == 3
+
+    # Terminada a leitura, a próxima com a mesma chave vai à API de novo
+    assert agendador.executar('leitura', chamada, chave=('aba', 'Despesas')) == ['linhas']
+    assert chamada.chamadas == 2
+
+
+def test_leituras_agrupadas_recebem_o_mesmo_erro(agendador):
+    chamada = ClienteInstavel(_erro(400))
+    resultados = _executar_agrupadas(agendador, chamada, 3)
+    assert chamada.chamadas == 1
+    assert all(isinstance(resultado, APIError) for resultado in resultados)
+
+
+def test_chaves_diferentes_nao_sao_agrupadas(agendador):
+    chamada = ClienteInstavel()
+    agendador.executar('leitura', chamada, chave=('aba', 'Despesas'))
+    agendador.executar('leitura', chamada, chave=('aba', 'Info_Obras'))
+    assert chamada.chamadas == 2 and agendador.metricas()['leituras_agrupadas'] == 0
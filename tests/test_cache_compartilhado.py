@@ -0,0 +1,26 @@
+"""Cache compartilhado em arquivos: as senhas da aba Usuarios nunca são publicadas."""
+import os
+
+from conftest import app
+
+
+def test_usuarios_nao_sao_publicados(backend, tmp_path):
+    compartilhado = app.CacheCompartilhadoArquivos(str(tmp_path), 'sheets:teste')
+    compartilhado.salvar_quadros(app._ler_abas_tipadas(backend), 'rev-1')
+
+    arquivos = [nome for _, _, nomes in os.walk(tmp_path) for nome in nomes]
+    assert not any(nome.startswith(app.ABA_USUARIOS) for nome in arquivos)
+    assert set(compartilhado.carregar_quadros('rev-1')) == {app.ABA_INFO, app.ABA_DESPESAS}
+
+
+def test_quadros_de_outra_replica_sao_adotados_sem_usuarios(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('OBRAS_CACHE_COMPARTILHADO', str(tmp_path / 'compartilhado'))
+    app.get_cache_compartilhado.clear()
+    # Outra réplica já leu a revisão atual e publicou os quadros
+    app.get_cache_compartilhado().salvar_quadros(app._ler_abas_tipadas(backend), backend.revision())
+
+    cache = app.get_data_cache()
+    df_info, _, df_usuarios = app._carregar_abas(backend, cache)
+    assert cache.origem == 'compartilhado' and df_usuarios is None
+    assert len(df_info) == 2
+    assert list(app.load_users()) == ['bench']
@@ -0,0 +1,187 @@
+"""Diário de escritas: reabertura após queda, envio depois de reiniciar e troca de chaves em conflito."""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import app, linhas_da_aba, nova_replica, reiniciar_processo
+
+
+def _quantas(despesas, obra_id, semana):
+    return int(((despesas['Obra_ID'] == obra_id) & (despesas['Semana_Ref'] == semana)).sum())
+
+
+def test_linha_cortada_pela_queda_e_descartada(backend, planilha):
+    diario = app.get_diario_escritas()
+    diario.registrar('insert', app.ABA_DESPESAS, [1, 51, '2023-12-25', 9.5], 'Nova despesa: Obra 001 - Semana 51')
+    with open(diario.caminho, 'a', encoding='utf-8') as f:
+        f.write('{"id": 2, "tipo": "insert", "aba": "Despesas_Sem') # Queda no meio da gravação
+
+    reiniciar_processo()
+    diario = app.get_diario_escritas()
+    assert [e['valores'] for e in diario.pendentes()] == [[1, 51, '2023-12-25', 9.5]]
+
+    # As linhas seguintes não ficam coladas à linha cortada
+    diario.registrar('insert', app.ABA_DESPESAS, [2, 51, '2023-12-25', 4.0], 'Nova despesa: Obra 002 - Semana 51')
+    with open(diario.caminho, encoding='utf-8') as f:
+        registros = [json.loads(linha) for linha in f]
+    assert [r['id'] for r in registros if 'id' in r] == [1, 2]
+
+    assert all(erro is None for _, erro in diario.enviar(backend))
+    despesas = linhas_da_aba(planilha, app.ABA_DESPESAS)
+    assert _quantas(despesas, 1, 51) == 1 and _quantas(despesas, 2, 51) == 1
+
+    reiniciar_processo()
+    assert app.get_diario_escritas().pendentes() == []
+
+
+def test_escrita_na_fila_sobrevive_ao_reinicio(backend, planilha):
+    app._carregar_abas(backend)
+    assert app.insert_new_despesa([1, 51, '2023-12-25', 9.5]) # Reprodutor desligado: fica só no diário
+    assert _quantas(linhas_da_aba(planilha, app.ABA_DESPESAS), 1, 51) == 0
+
+    reiniciar_processo()
+    # A nova carga já mostra a escrita pendente, reaplicada do diário sobre os dados do backend
+    _, despesas, _ = app._carregar_abas(backend)
+    assert _quantas(despesas, 1, 51) == 1
+
+    diario = app.get_diario_escritas()
+    assert all(erro is None for _, erro in diario.enviar(backend))
+    assert _quantas(linhas_da_aba(planilha, app.ABA_DESPESAS), 1, 51) == 1
+    assert diario.pendentes() == []
+
+
+def test_insercao_enviada_antes_da_queda_nao_duplica(backend, planilha):
+    diario = app.get_diario_escritas()
+    valores = [1, 51, '2023-12-25', 9.5]
+    id_entrada = diario.registrar('insert', app.ABA_DESPESAS, valores, 'Nova despesa: Obra 001 - Semana 51')
+    diario._marcar('enviando', [id_entrada])
+    # A linha chegou à planilha, mas o processo caiu antes de marcar a entrada como aplicada
+    planilha.abas[app.ABA_DESPESAS].linhas.append(valores)
+
+    reiniciar_processo()
+    diario = app.get_diario_escritas()
+    assert [e['enviando'] for e in diario.pendentes()] == [True]
+    diario.enviar(backend)
+    assert _quantas(linhas_da_aba(planilha, app.ABA_DESPESAS), 1, 51) == 1
+    assert diario.pendentes() == []
+
+
+def test_insercao_enviada_com_edicao_juntada_nao_duplica(backend, planilha):
+    diario = app.get_diario_escritas()
+    id_insercao = diario.registrar('insert', app.ABA_DESPESAS, [1, 51, '2023-12-25', 9.5], 'Nova despesa: Obra 001 - Semana 51')
+    id_edicao = diario.registrar('update', app.ABA_DESPESAS, [1, 51, '2023-12-25', 12.0], 'Despesa atualizada: Obra 001 - Semana 51')
+    diario._marcar('enviando', [id_insercao, id_edicao])
+    # A FilaEscrita juntou a edição à inserção: a linha gravada já tem o valor editado
+    planilha.abas[app.ABA_DESPESAS].linhas.append([1, 51, '2023-12-25', 12.0])
+
+    reiniciar_processo()
+    diario = app.get_diario_escritas()
+    assert all(erro is None for _, erro in diario.enviar(backend))
+    semana_51 = linhas_da_aba(planilha, app.ABA_DESPESAS).query('Obra_ID == 1 and Semana_Ref >= 51')
+    assert semana_51[['Semana_Ref', 'Gasto_Semana']].values.tolist() == [[51, 12.0]]
+    assert diario.pendentes() == []
+
+
+def test_insercao_enviando_com_chave_gravada_por_outra_sessao_e_realocada(backend, planilha):
+    diario = app.get_diario_escritas()
+    id_entrada = diario.registrar('insert', app.ABA_DESPESAS, [1, 51, '2023-12-25', 9.5], 'Nova despesa: Obra 001 - Semana 51')
+    diario._marcar('enviando', [id_entrada])
+    # O processo caiu antes de anexar, e outra sessão gravou a mesma chave com outros valores
+    planilha.abas[app.ABA_DESPESAS].linhas.append([1, 51, '2024-02-01', 3.0])
+
+    reiniciar_processo()
+    diario = app.get_diario_escritas()
+    resultados = diario.enviar(backend)
+    assert all(erro is None for _, erro in resultados)
+    assert sum('já em uso' in descricao for descricao, _ in resultados) == 1
+    semana_51 = linhas_da_aba(planilha, app.ABA_DESPESAS).query('Obra_ID == 1 and Semana_Ref >= 51')
+    assert semana_51[['Semana_Ref', 'Gasto_Semana']].values.tolist() == [[51, 3.0], [52, 9.5]]
+
+    reiniciar_processo()
+    assert app.get_diario_escritas().pendentes() == []
+
+
+def test_insercao_com_chave_ja_gravada_e_realocada(backend, planilha, api):
+    app._carregar_abas(backend) # Monta o índice de chaves usado pela reserva
+    obra_id = app.reservar_chave(app.ABA_INFO, (), backend=backend)
+    diario = app.get_diario_escritas()
+    diario.registrar('insert', app.ABA_INFO, [obra_id, 'Minha', 1000.0, '2024-01-01'], f'Nova obra: {obra_id:03d} - Minha')
+    diario.registrar('insert', app.ABA_DESPESAS, [obra_id, 1, '2024-01-01', 10.0], f'Nova despesa: Obra {obra_id:03d} - Semana 1')
+    diario.registrar('insert', app.ABA_DESPESAS, [1, 51, '2024-01-01', 5.0], 'Nova despesa: Obra 001 - Semana 51')
+
+    # Outra instância grava a mesma obra e a mesma semana antes do envio
+    planilha.abas[app.ABA_INFO].linhas.append([obra_id, 'Outra', 5.0, '2024-02-01'])
+    planilha.abas[app.ABA_DESPESAS].linhas.append([1, 51, '2024-02-01', 3.0])
+    api.registrar_escrita()
+
+    resultados = diario.enviar(backend)
+    assert all(erro is None for _, erro in resultados)
+    assert sum('já em uso' in descricao for descricao, _ in resultados) == 3
+
+    info = linhas_da_aba(planilha, app.ABA_INFO)
+    assert info.loc[info['Obra_ID'] == obra_id, 'Nome_Obra'].tolist() == ['Outra']
+    novo_id = int(info.loc[info['Nome_Obra'] == 'Minha', 'Obra_ID'].iloc[0])
+    assert novo_id > obra_id
+
+    despesas = linhas_da_aba(planilha, app.ABA_DESPESAS)
+    assert _quantas(despesas, novo_id, 1) == 1 and _quantas(despesas, obra_id, 1) == 0
+    semana_51 = despesas[(despesas['Obra_ID'] == 1) & (despesas['Semana_Ref'] >= 51)]
+    assert semana_51[['Semana_Ref', 'Gasto_Semana']].values.tolist() == [[51, 3.0], [52, 5.0]]
+
+    # A troca de chaves foi gravada no diário: nada volta a ser enviado depois de reiniciar
+    reiniciar_processo()
+    assert app.get_diario_escritas().pendentes() == []
+
+
+def _esperar_no_primeiro_append(backend, barreira, monkeypatch):
+    anexar = backend.append_rows
+    primeiro = [True]
+
+    def append_rows(aba, linhas):
+        if primeiro:
+            primeiro.pop()
+            barreira.wait()
+        return anexar(aba, linhas)
+    monkeypatch.setattr(backend, 'append_rows', append_rows)
+
+
+def test_replicas_que_reservam_a_mesma_chave_ao_mesmo_tempo(backend, planilha, tmp_path, monkeypatch):
+    # Duas réplicas sem cache compartilhado: cada uma com seu backend e seu diário
+    replicas = [(backend, app.DiarioEscritas(str(tmp_path / 'a.jsonl'))),
+                (nova_replica(planilha), app.DiarioEscritas(str(tmp_path / 'b.jsonl')))]
+    for replica, _ in replicas:
+        replica.read_tabs([app.ABA_INFO, app.ABA_DESPESAS])
+    obra_ids = {app.reservar_chave(app.ABA_INFO, (), backend=replica) for replica, _ in replicas}
+    semanas = {app.reservar_chave(app.ABA_DESPESAS, (1,), backend=replica) for replica, _ in replicas}
+    assert len(obra_ids) == 1 and len(semanas) == 1 # Sem contador compartilhado, as duas reservam o mesmo
+    obra_id, semana = obra_ids.pop(), semanas.pop()
+
+    for (_, diario), nome, gasto in zip(replicas, ('A', 'B'), (10.0, 20.0)):
+        diario.registrar('insert', app.ABA_INFO, [obra_id, nome, 1000.0, '2024-01-01'], f'Nova obra: {obra_id:03d} - {nome}')
+        diario.registrar('insert', app.ABA_DESPESAS, [obra_id, 1, '2024-01-01', gasto], f'Nova despesa: Obra {obra_id:03d} - Semana 1')
+        diario.registrar('insert', app.ABA_DESPESAS, [1, semana, '2024-01-01', gasto], f'Nova despesa: Obra 001 - Semana {semana}')
+
+    # Pior caso da corrida: as duas conferem as chaves antes de qualquer uma anexar
+    barreira = threading.Barrier(2, timeout=10)
+    for replica, _ in replicas:
+        _esperar_no_primeiro_append(replica, barreira, monkeypatch)
+    with ThreadPoolExecutor(2) as executor:
+        resultados = list(executor.map(lambda replica: replica[1].enviar(replica[0]), replicas))
+    assert all(erro is None for envio in resultados for _, erro in envio)
+    assert sum('já em uso' in descricao for envio in resultados for descricao, _ in envio) == 3
+
+    info = linhas_da_aba(planilha, app.ABA_INFO)
+    despesas = linhas_da_aba(planilha, app.ABA_DESPESAS)
+    assert not info['Obra_ID'].duplicated().any()
+    assert not despesas.duplicated(['Obra_ID', 'Semana_Ref']).any()
+    ids = dict(zip(info['Nome_Obra'].astype(str), info['Obra_ID'].tolist()))
+    assert {ids['A'], ids['B']} == {obra_id, obra_id + 1}
+    for nome, gasto in (('A', 10.0), ('B', 20.0)):
+        assert despesas.loc[despesas['Obra_ID'] == ids[nome], 'Gasto_Semana'].tolist() == [gasto]
+    obra_1 = despesas[(despesas['Obra_ID'] == 1) & (despesas['Semana_Ref'] >= semana)]
+    assert sorted(obra_1['Semana_Ref']) == [semana, semana + 1]
+    assert sorted(obra_1['Gasto_Semana']) == [10.0, 20.0]
+
+    # As trocas de chave ficaram no diário de cada réplica: nada volta a ser enviado
+    for _, diario in replicas:
+        assert app.DiarioEscritas(diario.caminho).pendentes() == []
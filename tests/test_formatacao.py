@@ -0,0 +1,35 @@
+"""Formatação vetorizada (formatar_moeda_series) x formatar_moeda, valor a valor."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import app
+
+
+@pytest.mark.parametrize('valor', [
+    0.0, -0.0, 0.004, -0.004, 0.005, -0.005, 1.0, 12.5, 999.999, 1000.0, -1234.56, 1234567.891,
+    -987654321.0, 1e15, -1e15,
+    # Quase no meio de dois centavos: o binário não representa o ,xx5 exato
+    0.125, 0.135, 1.005, 2.675, 1.015, -2.675, 1234.565, 8.325, 0.285, 1e6 + 0.005, 10.0049999,
+    np.nan, None,
+])
+def test_series_igual_ao_escalar(valor):
+    serie = pd.Series([valor], dtype=float, index=[7])
+    resultado = app.formatar_moeda_series(serie)
+    assert resultado.index.tolist() == [7]
+    assert resultado.iloc[0] == app.formatar_moeda(serie.iloc[0])
+
+
+def test_series_aleatoria_igual_ao_escalar():
+    rng = np.random.default_rng(42)
+    valores = np.concatenate([
+        rng.normal(0, 1e6, 2000),
+        np.round(rng.uniform(-1e4, 1e4, 2000), 2) + 0.005, # Empates em meio centavo
+        rng.integers(-10**9, 10**9, 500).astype(float),
+    ])
+    serie = pd.Series(valores)
+    assert app.formatar_moeda_series(serie).tolist() == [app.formatar_moeda(valor) for valor in valores]
+
+
+def test_series_vazia():
+    assert app.formatar_moeda_series(pd.Series([], dtype=float)).empty
@@ -0,0 +1,151 @@
+"""Importação em lote (ImportacaoLote): validação do arquivo e gravação em lotes no backend."""
+import pandas as pd
+import pytest
+
+from conftest import app, linhas_da_aba
+
+
+def _csv(tmp_path, linhas, separador=';'):
+    caminho = tmp_path / 'importacao.csv'
+    caminho.write_text('\n'.join(separador.join(linha) for linha in linhas) + '\n', encoding='utf-8')
+    return caminho
+
+
+def _validar(backend, tmp_path, linhas, tamanho_bloco=app.TAMANHO_BLOCO_IMPORTACAO, separador=';'):
+    df_info, df_despesas, _ = app._carregar_abas(backend)
+    blocos = app.ler_blocos_importacao(_csv(tmp_path, linhas, separador), 'importacao.csv', tamanho_bloco)
+    return app.ImportacaoLote().validar(blocos, df_info, df_despesas)
+
+
+def _problemas(lote):
+    return dict(zip(lote.problemas['Linha'].tolist(), lote.problemas['Problema'].tolist()))
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1234.5', 1234.5),
+    ('1.234,56', 1234.56),
+    ('1.234.567,8', 1234567.8),
+    ('R$ 10,00', 10.0),
+    ('  12,5 ', 12.5),
+    ('-3,25', -3.25),
+    (7, 7.0), # Números do XLSX chegam como números
+    (2.5, 2.5),
+])
+def test_numero_importado(texto, esperado):
+    assert app._numero_importado(pd.Series([texto], dtype=object)).tolist() == [esperado]
+
+
+@pytest.mark.parametrize('texto', ['', 'abc', None, '1,2,3'])
+def test_numero_importado_invalido(texto):
+    assert app._numero_importado(pd.Series([texto], dtype=object)).isna().all()
+
+
+def test_regras_de_validacao_de_despesas(backend, tmp_path):
+    lote = _validar(backend, tmp_path, [
+        ['Obra ID', 'semana_ref', 'Data Semana', 'GASTO_SEMANA'], # Nomes normalizados
+        ['1', '51', '25/12/2023', '1.234,56'],
+        ['x', '52', '2024-01-01', '10'],
+        ['1', '0', '2024-01-01', '10'],
+        ['1', '53', '31/02/2024', '10'],
+        ['1', '54', '2024-01-01', '-5'],
+        ['', '', '', ''], # Em branco: ignorada
+        ['1', '51', '2024-01-01', '3'],
+        ['1', '50', '2024-01-01', '3'],
+        ['9', '1', '2024-01-01', '3'],
+        ['2', '40000', '2024-01-01', '3'], # Não cabe em int16
+        ['2', '1,5', '2024-01-01', '3'],
+    ], tamanho_bloco=4) # Vários blocos: a numeração das linhas continua entre eles
+    assert lote.aba == app.ABA_DESPESAS
+    assert lote.linhas_lidas == 10
+    assert lote.validas.index.tolist() == [2]
+    assert lote.validas.iloc[0].tolist() == [1, 51, pd.Timestamp('2023-12-25'), 1234.56]
+    assert _problemas(lote) == {
+        3: "Obra_ID inválido",
+        4: "Semana_Ref inválida",
+        5: "Data_Semana inválida",
+        6: "Gasto_Semana inválido (não pode ser negativo)",
+        8: "Chave repetida no arquivo (vale a primeira ocorrência)",
+        9: "Já cadastrada",
+        10: "Obra não cadastrada",
+        11: "Semana_Ref inválida",
+        12: "Semana_Ref inválida",
+    }
+
+
+def test_regras_de_validacao_de_obras(backend, tmp_path):
+    lote = _validar(backend, tmp_path, [
+        ['Obra_ID', 'Nome_Obra', 'Valor_Total_Inicial', 'Data_Inicio'],
+        ['3', 'Nova', 'R$ 1.500,00', '2024-01-01'],
+        ['4', '', '100', '2024-01-01'],
+        ['5', 'Sem valor', '0', '2024-01-01'],
+        ['6', 'Sem data', '100', 'amanhã'],
+        ['1', 'Já existe', '100', '2024-01-01'],
+    ])
+    assert lote.aba == app.ABA_INFO
+    assert lote.validas['Obra_ID'].tolist() == [3] and lote.validas['Valor_Total_Inicial'].tolist() == [1500.0]
+    assert _problemas(lote) == {
+        3: "Nome_Obra vazio",
+        4: "Valor_Total_Inicial inválido (deve ser maior que zero)",
+        5: "Data_Inicio inválida",
+        6: "Já cadastrada",
+    }
+    assert lote.lacunas.empty
+
+
+def test_colunas_nao_reconhecidas(backend, tmp_path):
+    with pytest.raises(ValueError, match='colunas não reconhecidas'):
+        _validar(backend, tmp_path, [['a', 'b'], ['1', '2']])
+
+
+def test_lacunas_de_semanas(backend, tmp_path):
+    # Obra 1 tem as semanas 1-50; obra 2 ganha despesas só no arquivo
+    lote = _validar(backend, tmp_path, [
+        ['Obra_ID', 'Semana_Ref', 'Data_Semana', 'Gasto_Semana'],
+        ['1', '52', '2024-01-01', '1'],
+        ['1', '55', '2024-01-01', '1'],
+        ['2', '51', '2024-01-01', '1'],
+    ])
+    assert lote.lacunas.values.tolist() == [[1, '51, 53-54']]
+
+
+def test_gravar_em_lotes(backend, planilha, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'LINHAS_POR_ENVIO_IMPORTACAO', 2)
+    lote = _validar(backend, tmp_path, [['Obra_ID', 'Semana_Ref', 'Data_Semana', 'Gasto_Semana']]
+                    + [['1', str(semana), '2024-01-01', '1.5'] for semana in range(51, 56)], separador=',')
+    progresso = []
+    assert lote.gravar(backend, lambda enviadas, total: progresso.append((enviadas, total))) == 5
+    assert progresso == [(2, 5), (4, 5), (5, 5)]
+    despesas = linhas_da_aba(planilha, app.ABA_DESPESAS)
+    novas = despesas[(despesas['Obra_ID'] == 1) & (despesas['Semana_Ref'] > 50)]
+    assert novas['Semana_Ref'].tolist() == [51, 52, 53, 54, 55] and (novas['Gasto_Semana'] == 1.5).all()
+    assert lote.nao_gravadas.empty and lote.erro_gravacao is None
+
+
+def test_chaves_conferidas_de_novo_antes_de_cada_lote(backend, planilha, api, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'LINHAS_POR_ENVIO_IMPORTACAO', 2)
+    lote = _validar(backend, tmp_path, [['Obra_ID', 'Semana_Ref', 'Data_Semana', 'Gasto_Semana']]
+                    + [['1', str(semana), '2024-01-01', '1'] for semana in range(51, 57)])
+
+    # Depois da validação: outra sessão grava a semana 51 e o diário tem a 52 pendente
+    planilha.abas[app.ABA_DESPESAS].linhas.append([1, 51, '2024-02-01', 7.0])
+    api.registrar_escrita()
+    app.get_diario_escritas().registrar('insert', app.ABA_DESPESAS, [1, 52, '2024-02-01', 8.0], 'Nova despesa')
+
+    # E, entre o primeiro e o segundo lote, outra sessão grava a semana 55
+    anexar = backend.append_rows
+    lotes = []
+
+    def append_rows(aba, linhas):
+        lotes.append([linha[1] for linha in linhas])
+        if len(lotes) == 1:
+            planilha.abas[app.ABA_DESPESAS].linhas.append([1, 55, '2024-02-01', 9.0])
+        return anexar(aba, linhas)
+    monkeypatch.setattr(backend, 'append_rows', append_rows)
+
+    assert lote.gravar(backend) == 3
+    assert lotes == [[53, 54], [56]]
+    assert lote.nao_gravadas.values.tolist() == [[linha, "Já cadastrada (gravada durante a importação)"] for linha in (2, 3, 6)]
+    despesas = linhas_da_aba(planilha, app.ABA_DESPESAS)
+    obra_1 = despesas[(despesas['Obra_ID'] == 1) & (despesas['Semana_Ref'] > 50)]
+    assert not obra_1.duplicated(['Obra_ID', 'Semana_Ref']).any()
+    assert obra_1.set_index('Semana_Ref')['Gasto_Semana'].to_dict() == {51: 7.0, 53: 1.0, 54: 1.0, 55: 9.0, 56: 1.0}
@@ -0,0 +1,51 @@
+"""MatrizGastos atualizada pelas escritas (DataCache.aplicar_escrita) x montada do zero."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import app
+
+
+def _despesas():
+    return app._aplicar_schema(app.ABA_DESPESAS, pd.DataFrame({
+        'Obra_ID': [1, 1, 1, 2, 2, 3],
+        'Semana_Ref': [1, 2, 3, 1, 3, 2],
+        'Data_Semana': '2024-01-01',
+        'Gasto_Semana': [100.0, 50.0, 25.0, 10.0, 0.0, 7.5],
+    }))
+
+
+def _assert_mesma_matriz(incremental, montada):
+    assert sorted(incremental.obras) == sorted(montada.obras)
+    assert incremental.n_semanas == montada.n_semanas
+    pd.testing.assert_frame_equal(incremental.totais_por_semana(), montada.totais_por_semana())
+    obras = sorted(montada.obras)
+    for acumulado in (False, True):
+        np.testing.assert_allclose(incremental.mapa(obras, 1, montada.n_semanas, acumulado),
+                                   montada.mapa(obras, 1, montada.n_semanas, acumulado))
+    # Gasto total por obra (última semana do acumulado), sem depender da ordem de empate
+    total_incremental = incremental.mapa(obras, 1, incremental.n_semanas, acumulado=True)[:, -1]
+    np.testing.assert_allclose(total_incremental, montada.mapa(obras, 1, montada.n_semanas, acumulado=True)[:, -1])
+
+
+@pytest.mark.parametrize('densidade', [0.0, 1.01], ids=['densa', 'esparsa'])
+def test_escritas_incrementais_igualam_montagem(monkeypatch, densidade):
+    monkeypatch.setattr(app, 'DENSIDADE_MINIMA_MATRIZ', densidade)
+    cache = app.DataCache()
+    cache.definir(pd.DataFrame(), _despesas(), pd.DataFrame(), revisao='r1')
+    obter = lambda: cache.derivado('matriz_gastos', None, cache.df_despesas, lambda _, d: app.MatrizGastos(d))
+    matriz = obter()
+    assert matriz.densa == (densidade == 0.0)
+
+    escritas = [
+        [4, 6, '2024-02-05', 0.0], # Obra nova com gasto zero, numa semana além das existentes
+        [1, 4, '2024-01-22', 40.0], # Semana nova de obra existente
+        [1, 2, '2024-01-08', 80.0], # Edição (50 -> 80)
+        [2, 3, '2024-01-15', 12.0], # Edição de uma célula que tinha gasto zero
+        [3, 2, '2024-01-08', 0.0], # Edição zerando a única despesa da obra
+        [5, 1, '2024-01-01', 3.0],
+    ]
+    for valores in escritas:
+        cache.aplicar_escrita(app.ABA_DESPESAS, valores, revisao_muda=False)
+        assert obter() is matriz # Repassada para a nova versão, sem reconstruir
+        _assert_mesma_matriz(matriz, app.MatrizGastos(cache.df_despesas))
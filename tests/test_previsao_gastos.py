@@ -0,0 +1,79 @@
+"""PrevisaoGastos: ritmo, tendência e esgotamento do orçamento nos casos de borda."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import app
+
+
+def _previsao(obras, despesas):
+    info = app._aplicar_schema(app.ABA_INFO, pd.DataFrame(obras, columns=app.COLUNAS_ABAS[app.ABA_INFO]))
+    despesas = app._aplicar_schema(app.ABA_DESPESAS, pd.DataFrame(despesas, columns=app.COLUNAS_ABAS[app.ABA_DESPESAS]))
+    status = app.StatusFinanceiro(app.calcular_status_financeiro(info, despesas))
+    return app.PrevisaoGastos(status, app.DespesasPorObra(despesas))
+
+
+def _semana(numero):
+    return str((pd.Timestamp('2024-01-01') + pd.Timedelta(weeks=numero - 1)).date())
+
+
+@pytest.fixture
+def previsao():
+    return _previsao(
+        [[1, 'Sem gasto', 1000.0, '2024-01-01'],
+         [2, 'Uma semana', 1000.0, '2024-01-01'],
+         [3, 'Estourada', 100.0, '2024-01-01'],
+         [4, 'Regular', 10000.0, '2024-01-01']],
+        [[2, 1, _semana(1), 200.0],
+         [3, 1, _semana(1), 60.0],
+         [3, 2, _semana(2), 70.0]]
+        + [[4, semana, _semana(semana), 10.0 * semana] for semana in range(1, 11)])
+
+
+def _obra(previsao, obra_id):
+    return previsao.tabela.set_index('Obra_ID').loc[obra_id]
+
+
+def test_obra_sem_gastos(previsao):
+    obra = _obra(previsao, 1)
+    assert obra['Ritmo_Semanal'] == 0.0 and obra['Tendencia_Semanal'] == 0.0
+    assert np.isnan(obra['Semanas_Restantes']) and pd.isna(obra['Data_Esgotamento'])
+    assert not obra['Esgotado']
+
+
+def test_obra_com_uma_semana(previsao):
+    obra = _obra(previsao, 2)
+    assert obra['Ritmo_Semanal'] == 200.0
+    assert obra['Tendencia_Semanal'] == 0.0 # Um ponto só não define inclinação
+    assert obra['Semanas_Restantes'] == 4.0 # Saldo 800 / 200 por semana
+    assert obra['Data_Esgotamento'] == pd.Timestamp('2024-01-29')
+
+
+def test_obra_que_ja_passou_do_orcamento(previsao):
+    obra = _obra(previsao, 3)
+    assert obra['Esgotado'] and obra['Semanas_Restantes'] == 0.0
+    assert pd.isna(obra['Data_Esgotamento']) # A última semana não diz quando o saldo acabou
+    assert obra['Ritmo_Semanal'] == 65.0 and obra['Tendencia_Semanal'] == pytest.approx(10.0)
+
+
+def test_obra_regular(previsao):
+    obra = _obra(previsao, 4)
+    assert obra['Ritmo_Semanal'] == pytest.approx(85.0) # Média das semanas 7-10
+    assert obra['Tendencia_Semanal'] == pytest.approx(10.0)
+    assert obra['Semanas_Restantes'] == pytest.approx(9450.0 / 85.0)
+    assert obra['Data_Esgotamento'] == pd.Timestamp(_semana(10)) + pd.Timedelta(days=779) # ceil(111,18 semanas * 7)
+
+
+def test_alertas(previsao):
+    esgotadas, proximas = previsao.alertas()
+    assert esgotadas['Obra_ID'].tolist() == [3]
+    assert proximas['Obra_ID'].tolist() == [2] # Sem gasto (sem ritmo) não entra
+    assert previsao.alertas(semanas=200)[1]['Obra_ID'].tolist() == [2, 4]
+
+
+def test_nenhuma_obra_com_gastos():
+    previsao = _previsao([[1, 'A', 1000.0, '2024-01-01'], [2, 'B', 0.0, '2024-01-01']], [])
+    assert previsao.tabela['Ritmo_Semanal'].tolist() == [0.0, 0.0]
+    assert previsao.tabela['Semanas_Restantes'].isna().all() and previsao.tabela['Data_Esgotamento'].isna().all()
+    assert not previsao.tabela['Esgotado'].any() # Orçamento zero sem gasto não conta como esgotado
+    assert all(alerta.empty for alerta in previsao.alertas())
@@ -0,0 +1,82 @@
+"""Carga das abas: cabeçalho (_cabecalho_unico), datas (_converter_datas) e schema (_aplicar_schema)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import app
+
+
+@pytest.mark.parametrize('header, esperado, duplicadas', [
+    (['Obra_ID', 'Nome_Obra'], ['Obra_ID', 'Nome_Obra'], False),
+    (['a', '', None, 'b'], ['a', 'Coluna_B', 'Coluna_C', 'b'], False),
+    (['a', 'a', 'b', 'a'], ['a', 'a_DUP_1', 'b', 'a_DUP_2'], True),
+    # O sufixo pula nomes já usados, inclusive os que vieram assim da planilha
+    (['a', 'a_DUP_1', 'a'], ['a', 'a_DUP_1', 'a_DUP_2'], True),
+    (['a', 'a', 'a_DUP_1'], ['a', 'a_DUP_1', 'a_DUP_1_DUP_1'], True),
+    ([1, 1.5, 'x'], ['1', '1.5', 'x'], False),
+], ids=['simples', 'sem_titulo', 'duplicadas', 'sufixo_ocupado', 'colide_com_sufixo', 'numeros'])
+def test_cabecalho_unico(header, esperado, duplicadas):
+    cabecalho, houve_duplicadas = app._cabecalho_unico(header)
+    assert cabecalho == esperado and houve_duplicadas == duplicadas
+    assert len(set(cabecalho)) == len(cabecalho)
+
+
+def test_cabecalho_sem_titulo_mantem_dados_alinhados():
+    df = app._valores_para_dataframe(app.ABA_DESPESAS, [['Obra_ID', '', 'Gasto_Semana'], [1, 'x', 9.5], [2]])
+    assert df.columns.tolist() == ['Obra_ID', 'Coluna_B', 'Gasto_Semana']
+    assert df.values.tolist() == [[1, 'x', 9.5], [2, '', '']] # Linha curta completada com ''
+
+
+def test_converter_datas_mistas():
+    serie = pd.Series([45285, 45285.5, '2023-12-25', '2023-12-25T08:30:00', '05/03/2024', '', None, 'abc'], dtype=object)
+    datas = app._converter_datas(serie)
+    assert pd.api.types.is_datetime64_any_dtype(datas)
+    assert datas.tolist()[:5] == [
+        pd.Timestamp('2023-12-25'), # Número de série do Sheets
+        pd.Timestamp('2023-12-25 12:00'), # Fração do dia vira hora
+        pd.Timestamp('2023-12-25'), # ISO, como o app grava
+        pd.Timestamp('2023-12-25 08:30'),
+        pd.Timestamp('2024-03-05'), # Digitada à mão: dia primeiro
+    ]
+    assert datas.iloc[5:].isna().all()
+
+
+def test_converter_datas_so_seriais_e_ja_tipadas():
+    assert app._converter_datas(pd.Series([45285, 45286])).tolist() == [pd.Timestamp('2023-12-25'), pd.Timestamp('2023-12-26')]
+    tipadas = pd.Series(pd.to_datetime(['2024-01-01', None]))
+    assert app._converter_datas(tipadas) is tipadas
+
+
+def test_dia_primeiro_so_fora_do_padrao_iso():
+    datas = app._converter_datas(pd.Series(['2024-03-05', '05/03/2024', '13/01/2024']))
+    assert datas.tolist() == [pd.Timestamp('2024-03-05'), pd.Timestamp('2024-03-05'), pd.Timestamp('2024-01-13')]
+
+
+def test_aplicar_schema_com_nulos():
+    df = app._aplicar_schema(app.ABA_INFO, pd.DataFrame({
+        'Obra_ID': [1, np.nan, '', '3'],
+        'Nome_Obra': ['A', np.nan, '', 'B'],
+        'Valor_Total_Inicial': [1.5, '', None, '2'],
+        'Data_Inicio': ['2024-01-01', '', None, 45285],
+    }))
+    assert df.dtypes.astype(str).tolist() == ['int32', 'category', 'float64', 'datetime64[ns]']
+    assert df['Obra_ID'].tolist() == [1, 0, 0, 3] # Sem nulos: vazios viram o padrão
+    assert df['Nome_Obra'].cat.categories.tolist() == ['A', 'B'] # Vazio não vira categoria
+    assert df['Nome_Obra'].isna().tolist() == [False, True, True, False]
+    assert df['Valor_Total_Inicial'].isna().tolist() == [False, True, True, False]
+    assert df['Data_Inicio'].tolist()[3] == pd.Timestamp('2023-12-25')
+
+
+def test_aplicar_schema_int16_e_colunas_ausentes():
+    df = app._aplicar_schema(app.ABA_DESPESAS, pd.DataFrame({'Obra_ID': [1.0, np.nan], 'Semana_Ref': [np.nan, '7']}))
+    assert df.dtypes.astype(str).tolist() == ['int32', 'int16', 'datetime64[ns]', 'float64']
+    assert df[['Obra_ID', 'Semana_Ref']].values.tolist() == [[1, 0], [0, 7]]
+    assert df['Data_Semana'].isna().all() and df['Gasto_Semana'].tolist() == [0.0, 0.0]
+
+    parcial = app._aplicar_schema(app.ABA_DESPESAS, pd.DataFrame({'Obra_ID': ['2']}), completar=False)
+    assert parcial.columns.tolist() == ['Obra_ID'] and parcial['Obra_ID'].dtype == 'int32'
+
+
+def test_aplicar_schema_usuarios_como_texto():
+    df = app._aplicar_schema(app.ABA_USUARIOS, pd.DataFrame({'name': ['Ana'], 'username': ['ana'], 'password': [1234]}))
+    assert df['password'].tolist() == ['1234'] and df['password'].dtype == object
@@ -0,0 +1,106 @@
+"""Sincronização incremental (_sincronizar_abas): alterações feitas direto na planilha."""
+import pandas as pd
+import pytest
+
+from conftest import app, linhas_da_aba
+
+
+@pytest.fixture
+def leituras_completas(backend, monkeypatch):
+    """Carrega o cache e conta as leituras completas das abas feitas depois disso."""
+    # Toda a história é conferida por checksum a cada sincronização, não só um bloco do rodízio
+    monkeypatch.setattr(app, 'TAMANHO_BLOCO_VERIFICACAO', 10_000)
+    app._carregar_abas(backend)
+    chamadas = []
+    ler_abas_tipadas = app._ler_abas_tipadas
+
+    def contar(backend):
+        chamadas.append(backend)
+        return ler_abas_tipadas(backend)
+    monkeypatch.setattr(app, '_ler_abas_tipadas', contar)
+    return chamadas
+
+
+def _sincronizar(backend, api):
+    """Muda a revisão da planilha (como uma edição externa) e recarrega o cache."""
+    api.registrar_escrita()
+    cache = app.get_data_cache()
+    cache.verificado_em = 0.0
+    return app._carregar_abas(backend, cache)
+
+
+def test_linhas_acrescentadas_sao_lidas_sem_recarga_completa(backend, planilha, api, leituras_completas):
+    planilha.abas[app.ABA_INFO].linhas.append([3, 'Externa', 500.0, '2024-01-01'])
+    planilha.abas[app.ABA_DESPESAS].linhas.extend([[3, 1, '2024-01-01', 20.0], [1, 51, '2023-12-25', 9.5]])
+
+    df_info, df_despesas, _ = _sincronizar(backend, api)
+    assert leituras_completas == []
+    pd.testing.assert_frame_equal(df_despesas, linhas_da_aba(planilha, app.ABA_DESPESAS))
+    assert df_info['Obra_ID'].tolist() == [1, 2, 3]
+
+    # O índice de chaves do backend acompanha a leitura parcial
+    assert backend.update_rows(app.ABA_DESPESAS, [((1, 51), [1, 51, '2023-12-25', 11.0])]) == [None]
+    assert planilha.abas[app.ABA_DESPESAS].linhas[-1] == [1, 51, '2023-12-25', 11.0]
+
+
+def test_edicao_de_linha_antiga_forca_recarga_completa(backend, planilha, api, leituras_completas):
+    planilha.abas[app.ABA_DESPESAS].linhas[5][3] = 777.0
+
+    _, df_despesas, _ = _sincronizar(backend, api)
+    assert len(leituras_completas) == 1
+    assert df_despesas['Gasto_Semana'].iloc[4] == 777.0
+    pd.testing.assert_frame_equal(df_despesas, linhas_da_aba(planilha, app.ABA_DESPESAS))
+
+
+@pytest.mark.parametrize('posicao', [3, -1], ids=['meio', 'ultima'])
+def test_remocao_de_linha_forca_recarga_completa(backend, planilha, api, leituras_completas, posicao):
+    linhas = planilha.abas[app.ABA_DESPESAS].linhas
+    total = len(linhas) - 1
+    del linhas[posicao]
+
+    _, df_despesas, _ = _sincronizar(backend, api)
+    assert len(leituras_completas) == 1
+    assert len(df_despesas) == total - 1
+    pd.testing.assert_frame_equal(df_despesas, linhas_da_aba(planilha, app.ABA_DESPESAS))
+
+
+def _enviar_e_verificar(backend):
+    """Envia as escritas do diário e confere a revisão do backend, como a próxima página."""
+    assert all(erro is None for _, erro in app.get_diario_escritas().enviar(backend))
+    cache = app.get_data_cache()
+    cache.verificado_em = 0.0
+    return app._carregar_abas(backend, cache)
+
+
+@pytest.fixture
+def sincronizacoes(monkeypatch):
+    chamadas = []
+    sincronizar_abas = app._sincronizar_abas
+
+    def contar(*args):
+        chamadas.append(args)
+        return sincronizar_abas(*args)
+    monkeypatch.setattr(app, '_sincronizar_abas', contar)
+    return chamadas
+
+
+def test_revisao_da_propria_escrita_e_adotada(backend, planilha, api, leituras_completas, sincronizacoes):
+    revisao = api.revisao
+    assert app.insert_new_despesa([1, 51, '2023-12-25', 9.5])
+    _, df_despesas, _ = _enviar_e_verificar(backend)
+    assert api.revisao == revisao + 1
+    assert sincronizacoes == [] and leituras_completas == []
+    assert app.get_data_cache().revisao == revisao + 1
+    pd.testing.assert_frame_equal(df_despesas, linhas_da_aba(planilha, app.ABA_DESPESAS))
+
+
+def test_edicao_externa_junto_com_a_propria_escrita_e_sincronizada(backend, planilha, api, leituras_completas, sincronizacoes):
+    assert app.insert_new_despesa([1, 51, '2023-12-25', 9.5])
+    # Outra instância acrescenta uma linha entre a nossa escrita e a verificação
+    planilha.abas[app.ABA_DESPESAS].linhas.append([2, 51, '2023-12-25', 4.0])
+    api.registrar_escrita()
+
+    _, df_despesas, _ = _enviar_e_verificar(backend)
+    assert len(sincronizacoes) == 1 and leituras_completas == []
+    pd.testing.assert_frame_equal(df_despesas, linhas_da_aba(planilha, app.ABA_DESPESAS))
+    assert app.get_data_cache().revisao == api.revisao
@@ -0,0 +1,48 @@
+"""Snapshot em disco: as senhas da aba Usuarios nunca são gravadas."""
+import os
+
+import pandas as pd
+
+from conftest import app
+
+
+def _abas():
+    return {
+        app.ABA_INFO: app._aplicar_schema(app.ABA_INFO, pd.DataFrame({'Obra_ID': [1], 'Nome_Obra': ['A']})),
+        app.ABA_DESPESAS: app._aplicar_schema(app.ABA_DESPESAS, pd.DataFrame({'Obra_ID': [1], 'Semana_Ref': [1]})),
+        app.ABA_USUARIOS: pd.DataFrame({'name': ['Ana'], 'username': ['ana'], 'password': ['segredo']}),
+    }
+
+
+def test_usuarios_ficam_fora_do_snapshot(tmp_path):
+    snapshot = app.SnapshotDisco(str(tmp_path), 'sheets:teste')
+    snapshot.salvar(_abas(), 'rev-1')
+
+    assert not any(nome.startswith(app.ABA_USUARIOS) for nome in os.listdir(tmp_path))
+    abas, revisao, _ = snapshot.carregar()
+    assert revisao == 'rev-1' and set(abas) == {app.ABA_INFO, app.ABA_DESPESAS}
+
+
+def test_usuarios_de_snapshot_antigo_sao_ignorados_e_apagados(tmp_path, monkeypatch):
+    snapshot = app.SnapshotDisco(str(tmp_path), 'sheets:teste')
+    # Snapshot gravado por uma versão que ainda copiava os usuários
+    monkeypatch.setattr(app, 'ABAS_SEM_COPIA', ())
+    snapshot.salvar(_abas(), 'rev-1')
+    monkeypatch.undo()
+
+    abas, _, _ = snapshot.carregar()
+    assert app.ABA_USUARIOS not in abas
+    snapshot.salvar(abas, 'rev-2')
+    assert not any(nome.startswith(app.ABA_USUARIOS) for nome in os.listdir(tmp_path))
+
+
+def test_carga_do_snapshot_le_usuarios_do_backend(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('OBRAS_SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    app.get_snapshot_disco.clear()
+    abas = app._ler_abas_tipadas(backend)
+    app.get_snapshot_disco().salvar(abas, backend.revision())
+
+    cache = app.get_data_cache()
+    app._carregar_abas(backend, cache)
+    assert cache.origem == 'snapshot' and cache.df_usuarios is None
+    assert list(app.load_users()) == ['bench']
@@ -0,0 +1,75 @@
+"""SQLiteBackend: leitura, escrita e reserva de chaves (_Contadores) entre instâncias do mesmo arquivo."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import app
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / 'obras.db')
+
+
+@pytest.fixture
+def sqlite(caminho):
+    backend = app.SQLiteBackend(caminho)
+    backend.append_rows(app.ABA_INFO, [[1, 'Obra A', 1000.0, '2024-01-01'], [2, 'Obra B', 500.0, '2024-02-01']])
+    backend.append_rows(app.ABA_DESPESAS, [[1, semana, '2024-01-01', 10.0 * semana] for semana in (1, 2, 3)])
+    return backend
+
+
+def test_leitura_das_linhas_gravadas(sqlite):
+    info = app._aplicar_schema(app.ABA_INFO, sqlite.read_tab(app.ABA_INFO))
+    assert info['Obra_ID'].tolist() == [1, 2] and info['Nome_Obra'].astype(str).tolist() == ['Obra A', 'Obra B']
+    abas = sqlite.read_tabs([app.ABA_INFO, app.ABA_DESPESAS])
+    assert len(abas[app.ABA_DESPESAS]) == 3
+    faixas = sqlite.read_row_ranges([(app.ABA_DESPESAS, 1, 3), (app.ABA_DESPESAS, 2, None)])
+    assert [df['Semana_Ref'].tolist() for df in faixas] == [[2, 3], [3]]
+    assert sqlite.read_rows(app.ABA_DESPESAS, [(1, 3), (1, 9)]).values.tolist() == [[1, 3, '2024-01-01', 30.0]]
+
+
+def test_append_e_update(sqlite):
+    sqlite.append_row(app.ABA_DESPESAS, [2, 1, '2024-02-01', 5.0])
+    # Chave repetida: só a própria linha falha, o resto do lote é gravado
+    erros = sqlite.append_rows(app.ABA_DESPESAS, [[1, 4, '2024-01-22', 40.0], [1, 2, '2024-01-08', 99.0]])
+    assert erros[0] is None and 'UNIQUE' in erros[1]
+
+    assert sqlite.update_row(app.ABA_DESPESAS, (1, 2), [1, 2, '2024-01-08', 25.0])
+    assert not sqlite.update_row(app.ABA_DESPESAS, (7, 1), [7, 1, '2024-01-08', 1.0])
+    assert sqlite.update_rows(app.ABA_INFO, [((2,), [2, 'Obra B2', 600.0, '2024-02-01']), ((9,), [9, 'X', 1.0, '2024-01-01'])]) \
+        == [None, "Linha não encontrada para atualização."]
+
+    despesas = sqlite.read_tab(app.ABA_DESPESAS)
+    assert despesas[['Obra_ID', 'Semana_Ref', 'Gasto_Semana']].values.tolist() == [
+        [1, 1, 10.0], [1, 2, 25.0], [1, 3, 30.0], [2, 1, 5.0], [1, 4, 40.0]] # Ordem de inserção
+    assert sqlite.read_tab(app.ABA_INFO)['Nome_Obra'].tolist() == ['Obra A', 'Obra B2']
+    assert sqlite.existing_keys(app.ABA_DESPESAS, [(1, 4), (2, 1), (2, 2)]) == {(1, 4), (2, 1)}
+
+
+def test_revisao_muda_com_escritas_de_outra_conexao(sqlite, caminho):
+    revisao = sqlite.revision()
+    app.SQLiteBackend(caminho).append_row(app.ABA_INFO, [3, 'Obra C', 1.0, '2024-03-01'])
+    assert sqlite.revision() != revisao
+    assert sqlite.read_tab(app.ABA_INFO)['Obra_ID'].tolist() == [1, 2, 3] # Os dados persistem no arquivo
+
+
+def test_reserva_de_chaves(sqlite, caminho):
+    assert sqlite.reserve_key(app.ABA_INFO, (), 1) == 3 # Depois da maior gravada
+    assert sqlite.reserve_key(app.ABA_INFO, (), 1) == 4 # Reservada não volta, mesmo sem gravar
+    assert sqlite.reserve_key(app.ABA_INFO, (), 10) == 10 # Respeita o mínimo
+    assert sqlite.reserve_key(app.ABA_DESPESAS, (1,), 1) == 4 # Contador por obra
+    assert sqlite.reserve_key(app.ABA_DESPESAS, (2,), 1) == 1
+    # O contador fica no arquivo: outra instância (ou um reinício) continua dele
+    assert app.SQLiteBackend(caminho).reserve_key(app.ABA_INFO, (), 1) == 11
+    # Linhas gravadas por fora, além do contador, também são respeitadas
+    sqlite.append_row(app.ABA_INFO, [20, 'Externa', 1.0, '2024-01-01'])
+    assert sqlite.reserve_key(app.ABA_INFO, (), 1) == 21
+
+
+def test_reserva_atomica_entre_instancias(sqlite, caminho):
+    # Várias instâncias sobre o mesmo arquivo (como processos do app) reservando ao mesmo tempo
+    instancias = [sqlite] + [app.SQLiteBackend(caminho) for _ in range(3)]
+    with ThreadPoolExecutor(8) as executor:
+        reservas = list(executor.map(lambda i: instancias[i % 4].reserve_key(app.ABA_DESPESAS, (1,), 1), range(200)))
+    assert sorted(reservas) == list(range(4, 204))